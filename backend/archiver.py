@@ -0,0 +1,203 @@
+import asyncio
+import json
+import logging
+import zlib
+from datetime import datetime, timedelta
+from database import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+# Message fields stored per row in an archive payload, in order
+ARCHIVE_FIELDS = ("id", "role", "content", "created_at", "parent_id", "version")
+
+def _decode_payload(payload: bytes) -> list:
+    return json.loads(zlib.decompress(payload).decode("utf-8"))
+
+def load_archived_messages(conversation_id: str, conn=None) -> list:
+    """
+    Message dicts of an archived conversation, oldest first, without restoring it.
+    Reads on `conn` when given (it must have no unread result), else on a pooled connection.
+    """
+    if conn is None:
+        with get_db_connection() as conn:
+            return load_archived_messages(conversation_id, conn)
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT payload FROM conversation_archives WHERE conversation_id = %s",
+        (conversation_id,)
+    )
+    archive = cursor.fetchone()
+    cursor.close()
+    if not archive:
+        return []
+    return [
+        {"conversation_id": conversation_id, **dict(zip(ARCHIVE_FIELDS, row))}
+        for row in _decode_payload(archive[0])
+    ]
+
+def restore_conversation(conversation_id: str) -> bool:
+    """
+    Move an archived conversation's messages back into the messages table.
+
+    Runs under a row lock on the conversation, so concurrent requests for the
+    same conversation restore it once. Returns True if anything was restored.
+    """
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                "SELECT archived_at FROM conversations WHERE id = %s FOR UPDATE",
+                (conversation_id,)
+            )
+            conversation = cursor.fetchone()
+            if not conversation or conversation[0] is None:
+                conn.commit()
+                return False
+
+            cursor.execute(
+                "SELECT payload FROM conversation_archives WHERE conversation_id = %s",
+                (conversation_id,)
+            )
+            archive = cursor.fetchone()
+            rows = _decode_payload(archive[0]) if archive else []
+            if rows:
+                # IGNORE: a message written while archiving may already be present
+                cursor.executemany(
+                    "INSERT IGNORE INTO messages (id, conversation_id, role, content, created_at, parent_id, version) "
+                    "VALUES (%s, %s, %s, %s, %s, %s, %s)",
+                    [
+                        (message_id, conversation_id, role, content, datetime.fromisoformat(created_at), parent_id, version)
+                        for message_id, role, content, created_at, parent_id, version in rows
+                    ]
+                )
+            cursor.execute("DELETE FROM conversation_archives WHERE conversation_id = %s", (conversation_id,))
+            cursor.execute(
+                "UPDATE conversations SET archived_at = NULL, restored_at = CURRENT_TIMESTAMP, updated_at = updated_at WHERE id = %s",
+                (conversation_id,)
+            )
+            conn.commit()
+            logger.info(f"Restored conversation {conversation_id} ({len(rows)} messages)")
+            return True
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+
+class ConversationArchiver:
+    """
+    Background worker that moves cold conversations out of the messages table.
+
+    A conversation that has not been written to (or restored) for
+    `inactive_days` has all its messages packed into one zlib-compressed
+    JSON blob in conversation_archives, keeping the hot tables and their
+    indexes small. Endpoints call restore_conversation on first access.
+    Each run takes batches of `batch_size`, pausing `batch_delay` seconds
+    between them, until no cold conversations are left.
+    Archived message text is not covered by full-text search; titles are.
+    """
+
+    def __init__(self, inactive_days=90, batch_size=50, batch_delay=1.0, max_messages=10000, interval=3600.0):
+        self.inactive_days = inactive_days
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.max_messages = max_messages
+        self.interval = interval
+        self._task = None
+
+    def start(self):
+        """Start the archive loop on the running event loop"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            logger.info("Conversation archiver started")
+
+    async def stop(self):
+        """Cancel the archive loop and wait for it to exit"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            logger.info("Conversation archiver stopped")
+
+    async def _run(self):
+        while True:
+            try:
+                while True:
+                    conversation_ids = await asyncio.to_thread(self._cold_conversations)
+                    for conversation_id in conversation_ids:
+                        await asyncio.to_thread(self.archive_conversation, conversation_id)
+                    if len(conversation_ids) < self.batch_size:
+                        break
+                    await asyncio.sleep(self.batch_delay)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error archiving conversations: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    def _cold_conversations(self):
+        cutoff = datetime.now() - timedelta(days=self.inactive_days)
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT id FROM conversations
+                WHERE archived_at IS NULL AND deleted_at IS NULL
+                  AND updated_at < %s AND (restored_at IS NULL OR restored_at < %s)
+                  AND message_count BETWEEN 1 AND %s
+                ORDER BY updated_at ASC
+                LIMIT %s
+                """,
+                (cutoff, cutoff, self.max_messages, self.batch_size)
+            )
+            rows = cursor.fetchall()
+            cursor.close()
+            return [row[0] for row in rows]
+
+    def archive_conversation(self, conversation_id: str) -> bool:
+        """Pack a conversation's messages into its archive row. Returns True if archived."""
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(
+                    "SELECT id FROM conversations WHERE id = %s AND archived_at IS NULL AND deleted_at IS NULL FOR UPDATE",
+                    (conversation_id,)
+                )
+                if not cursor.fetchone():
+                    conn.commit()
+                    return False
+
+                cursor.execute(
+                    "SELECT id, role, content, created_at, parent_id, version FROM messages "
+                    "WHERE conversation_id = %s ORDER BY created_at ASC",
+                    (conversation_id,)
+                )
+                rows = [
+                    [message_id, role, content, created_at.isoformat(), parent_id, version]
+                    for message_id, role, content, created_at, parent_id, version in cursor.fetchall()
+                ]
+                payload = zlib.compress(json.dumps(rows, separators=(",", ":")).encode("utf-8"), 6)
+
+                cursor.execute(
+                    "INSERT INTO conversation_archives (conversation_id, message_count, payload) VALUES (%s, %s, %s)",
+                    (conversation_id, len(rows), payload)
+                )
+                cursor.execute("DELETE FROM messages WHERE conversation_id = %s", (conversation_id,))
+                cursor.execute(
+                    "UPDATE conversations SET archived_at = CURRENT_TIMESTAMP, updated_at = updated_at WHERE id = %s",
+                    (conversation_id,)
+                )
+                conn.commit()
+                logger.info(f"Archived conversation {conversation_id} ({len(rows)} messages, {len(payload)} bytes)")
+                return True
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+
+# Create singleton instance
+conversation_archiver = ConversationArchiver()
@@ -0,0 +1,95 @@
+"""
+Benchmark message-list serialization for large threads
+
+Compares the previous get_messages path (dict rows, isoformat, then
+List[MessageResponse] validation and JSONResponse rendering) with the
+streaming encoder in serialization.py, on synthetic rows so no database is
+needed.
+
+Usage:
+    python benchmark_messages.py [--messages 5000] [--repeat 20]
+"""
+import argparse
+import json
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List
+sys.path.insert(0, str(Path(__file__).parent))
+
+from pydantic import TypeAdapter
+from serialization import coalesce, encode_message_row
+from routes.chat_routes import MessageResponse
+
+def make_rows(count):
+    conversation_id = str(uuid.uuid4())
+    started = datetime(2024, 1, 1)
+    rows = []
+    parent_id = None
+    for i in range(count):
+        message_id = str(uuid.uuid4())
+        rows.append((
+            message_id,
+            conversation_id,
+            "user" if i % 2 == 0 else "assistant",
+            "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 8,
+            started + timedelta(seconds=i),
+            parent_id,
+            1
+        ))
+        parent_id = message_id
+    return rows
+
+def previous_path(rows, adapter):
+    messages = [
+        {"id": r[0], "conversation_id": r[1], "role": r[2], "content": r[3], "created_at": r[4],
+         "parent_id": r[5], "version": r[6]}
+        for r in rows
+    ]
+    for msg in messages:
+        msg["created_at"] = msg["created_at"].isoformat()
+    validated = adapter.validate_python(messages)
+    content = adapter.dump_python(validated, mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+def streaming_path(rows):
+    def pieces():
+        yield "["
+        separator = ""
+        for row in rows:
+            yield separator + encode_message_row(row)
+            separator = ","
+        yield "]"
+    return b"".join(coalesce(pieces()))
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark message-list serialization")
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rows = make_rows(args.messages)
+    adapter = TypeAdapter(List[MessageResponse])
+
+    # Both paths must produce identical bytes
+    assert previous_path(rows, adapter) == streaming_path(rows)
+
+    before = timed(lambda: previous_path(rows, adapter), args.repeat)
+    after = timed(lambda: streaming_path(rows), args.repeat)
+    print(f"{args.messages} messages, best of {args.repeat}")
+    print(f"  previous (validate + render): {before * 1000:8.2f} ms")
+    print(f"  streaming encoder:            {after * 1000:8.2f} ms")
+    print(f"  speedup:                      {before / after:8.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+from fastapi import FastAPI
+from dotenv import load_dotenv
+from starlette.middleware.cors import CORSMiddleware
+import asyncio
+import os
+import logging
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+from database import get_connection_pool
+from routes import chat_routes, health_routes
+
+logger = logging.getLogger(__name__)
+
+def create_app() -> FastAPI:
+    """
+    Build the chat API.
+
+    Nothing here touches the network: the OpenAI client is created on the
+    first model call and the MySQL pool on the first query. Startup only
+    kicks off a background warm-up of the pool, so the liveness endpoint
+    answers immediately and readiness flips once the database is reachable.
+
+    Run with: uvicorn chat_app:create_app --factory
+    """
+    app = FastAPI(title="Chat API")
+    app.include_router(chat_routes.router)
+    app.include_router(health_routes.router)
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_credentials=True,
+        allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    @app.on_event("startup")
+    async def startup_event():
+        chat_routes._spawn(_warm_up_database())
+        await chat_routes.start_background_workers()
+
+    @app.on_event("shutdown")
+    async def shutdown_event():
+        await chat_routes.stop_background_workers()
+
+    return app
+
+async def _warm_up_database():
+    try:
+        await asyncio.to_thread(get_connection_pool)
+    except Exception as e:
+        logger.error(f"Database warm-up failed: {str(e)}")
@@ -1,9 +1,9 @@
-from openai import OpenAI
 import os
 import logging
-from typing import List, Dict
+from typing import List, Dict, Optional
 from dotenv import load_dotenv
 from pathlib import Path
+from usage_ledger import UsageLedger
 
 # Load environment variables
 ROOT_DIR = Path(__file__).parent
@@ -11,20 +11,28 @@ load_dotenv(ROOT_DIR / '.env')
 
 logger = logging.getLogger(__name__)
 
-# Initialize OpenAI client
-client = OpenAI(api_key=os.environ.get('OPENAI_API_KEY'))
-
 class ChatGPTService:
-    def __init__(self, model="gpt-4.1"):
-        self.model = model
+    def __init__(self, model=None):
+        self.model = model or os.environ.get('OPENAI_MODEL', 'gpt-4.1')
         self.system_prompt = "You are a helpful assistant."
+        self.usage = UsageLedger()
+        self._client = None
+    
+    @property
+    def client(self):
+        """OpenAI client, created (and the openai package imported) on first use"""
+        if self._client is None:
+            from openai import OpenAI
+            self._client = OpenAI(api_key=os.environ.get('OPENAI_API_KEY'))
+        return self._client
     
-    async def generate_response(self, messages: List[Dict[str, str]]) -> str:
+    async def generate_response(self, messages: List[Dict[str, str]], conversation_id: Optional[str] = None) -> str:
         """
         Generate AI response using OpenAI API
         
         Args:
             messages: List of message dicts with 'role' and 'content'
+            conversation_id: Conversation to attribute token usage to
         
         Returns:
             AI generated response text
@@ -43,12 +51,13 @@ class ChatGPTService:
                 })
             
             # Call OpenAI API
-            response = client.chat.completions.create(
+            response = self.client.chat.completions.create(
                 model=self.model,
                 messages=api_messages,
                 temperature=0.7,
                 max_tokens=2000
             )
+            self.usage.record(conversation_id, self.model, response.usage)
             
             # Extract response text
             ai_response = response.choices[0].message.content
@@ -60,18 +69,19 @@ class ChatGPTService:
             logger.error(f"Error generating response: {str(e)}")
             raise Exception(f"Failed to generate AI response: {str(e)}")
     
-    async def generate_title(self, first_message: str) -> str:
+    async def generate_title(self, first_message: str, conversation_id: Optional[str] = None) -> str:
         """
         Generate a conversation title from the first message
         
         Args:
             first_message: First user message in the conversation
+            conversation_id: Conversation to attribute token usage to
         
         Returns:
             Generated title (max 50 chars)
         """
         try:
-            response = client.chat.completions.create(
+            response = self.client.chat.completions.create(
                 model=self.model,
                 messages=[
                     {"role": "system", "content": "Generate a short title (max 5 words) for a conversation that starts with the following message. Only return the title, nothing else."},
@@ -80,6 +90,7 @@ class ChatGPTService:
                 temperature=0.7,
                 max_tokens=20
             )
+            self.usage.record(conversation_id, self.model, response.usage)
             
             title = response.choices[0].message.content.strip()
             # Truncate if too long
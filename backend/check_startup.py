@@ -0,0 +1,56 @@
+"""
+Measure chat service cold start against its budget
+
+Imports chat_app and builds the app in a fresh interpreter, the way a new
+worker would, and fails if that takes longer than the budget. No network
+access is needed.
+
+Usage:
+    python check_startup.py [--budget 0.75] [--runs 5]
+"""
+import argparse
+import subprocess
+import sys
+from pathlib import Path
+
+# Seconds a fresh worker may spend importing and building the app
+IMPORT_TIME_BUDGET = 0.75
+
+MEASURE = """
+import time
+started = time.perf_counter()
+import chat_app
+chat_app.create_app()
+print(time.perf_counter() - started)
+"""
+
+def measure(runs):
+    timings = []
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-c", MEASURE],
+            cwd=Path(__file__).parent,
+            capture_output=True,
+            text=True,
+            check=True
+        )
+        timings.append(float(result.stdout.strip().splitlines()[-1]))
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description="Check chat service startup time")
+    parser.add_argument("--budget", type=float, default=IMPORT_TIME_BUDGET)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    timings = measure(args.runs)
+    best = min(timings)
+    print(f"Import + create_app: best {best * 1000:.0f} ms, worst {max(timings) * 1000:.0f} ms "
+          f"(budget {args.budget * 1000:.0f} ms)")
+    if best > args.budget:
+        print("❌ Over budget")
+        sys.exit(1)
+    print("✅ Within budget")
+
+if __name__ == "__main__":
+    main()
@@ -2,28 +2,62 @@ import mysql.connector
 from mysql.connector import pooling
 import os
 import logging
+import threading
 from contextlib import contextmanager
+from pathlib import Path
+from dotenv import load_dotenv
 
 logger = logging.getLogger(__name__)
 
-# MySQL connection configuration
-MYSQL_CONFIG = {
-    'host': 'mgielen.zapto.org',
-    'port': 3306,
-    'user': 'matthias',
-    'password': 'DigiuSeppe2018___',
-    'database': 'chatgpt_clone'
-}
+ROOT_DIR = Path(__file__).parent
 
-# Connection pool will be created after database initialization
+def get_mysql_config():
+    """
+    MySQL connection configuration, read from the environment when first needed.
+    CHAT_MYSQL_* settings take precedence over the shared MYSQL_* ones. backend/.env
+    is loaded here too, so scripts get the same settings as the app; variables
+    already set in the environment win.
+    """
+    load_dotenv(ROOT_DIR / '.env')
+    return {
+        'host': os.environ.get('CHAT_MYSQL_HOST', os.environ.get('MYSQL_HOST', 'localhost')),
+        'port': int(os.environ.get('CHAT_MYSQL_PORT', os.environ.get('MYSQL_PORT', 3306))),
+        'user': os.environ.get('CHAT_MYSQL_USER', os.environ.get('MYSQL_USER')),
+        'password': os.environ.get('CHAT_MYSQL_PASSWORD', os.environ.get('MYSQL_PASSWORD')),
+        'database': os.environ.get('CHAT_MYSQL_DATABASE', 'chatgpt_clone'),
+        'connection_timeout': int(os.environ.get('CHAT_MYSQL_CONNECT_TIMEOUT', 5))
+    }
+
+# Connection pool is created lazily, by the first caller that needs a connection
 connection_pool = None
+_init_lock = threading.Lock()
+
+# Streaming responses get their own connections, capped separately from the pool
+STREAM_CONNECTIONS = int(os.environ.get('CHAT_MYSQL_STREAM_CONNECTIONS', 10))
+STREAM_WAIT_TIMEOUT = 30.0
+_stream_slots = threading.BoundedSemaphore(STREAM_CONNECTIONS)
+
+# Length of the denormalized last-message excerpt kept on each conversation
+PREVIEW_LENGTH = 200
+
+# Row in list_versions that versions the conversation listing
+CONVERSATION_LIST = "conversations"
+
+def bump_list_version(cursor, name=CONVERSATION_LIST):
+    """Advance a list version inside the caller's transaction; call right before commit"""
+    cursor.execute("UPDATE list_versions SET version = version + 1 WHERE name = %s", (name,))
+
+def message_preview(content: str) -> str:
+    """Excerpt of a message for conversations.last_message_preview"""
+    content = " ".join(content.split())
+    return content[:PREVIEW_LENGTH - 3] + "..." if len(content) > PREVIEW_LENGTH else content
 
 @contextmanager
 def get_db_connection():
     """Context manager for database connections"""
     connection = None
     try:
-        connection = connection_pool.get_connection()
+        connection = get_connection_pool().get_connection()
         yield connection
     except mysql.connector.Error as err:
         logger.error(f"Database error: {err}")
@@ -34,20 +68,152 @@ def get_db_connection():
         if connection and connection.is_connected():
             connection.close()
 
+@contextmanager
+def get_stream_connection():
+    """
+    Context manager for a dedicated, non-pooled connection.
+
+    For responses that hold a connection until the client has read them
+    (exports, message lists), so slow downloads cannot exhaust the pool.
+    At most STREAM_CONNECTIONS are open at once; callers beyond that wait
+    up to STREAM_WAIT_TIMEOUT seconds for a slot.
+    """
+    # Make sure the database exists before connecting to it directly
+    get_connection_pool()
+    if not _stream_slots.acquire(timeout=STREAM_WAIT_TIMEOUT):
+        raise RuntimeError("Too many streaming connections")
+    connection = None
+    try:
+        connection = mysql.connector.connect(**get_mysql_config())
+        yield connection
+    except mysql.connector.Error as err:
+        logger.error(f"Database error: {err}")
+        raise
+    finally:
+        if connection and connection.is_connected():
+            connection.close()
+        _stream_slots.release()
+
+def ensure_column(cursor, table, column, definition):
+    """Add a column to an existing table if it is missing. Returns True if added."""
+    cursor.execute(
+        "SELECT COUNT(*) FROM information_schema.COLUMNS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s",
+        (table, column)
+    )
+    if cursor.fetchone()[0]:
+        return False
+    cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+    logger.info(f"Added column {table}.{column}")
+    return True
+
+def ensure_index(cursor, table, index, columns, kind="INDEX"):
+    """Add an index to an existing table if it is missing. Returns True if added."""
+    cursor.execute(
+        "SELECT COUNT(*) FROM information_schema.STATISTICS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s",
+        (table, index)
+    )
+    if cursor.fetchone()[0]:
+        return False
+    cursor.execute(f"ALTER TABLE {table} ADD {kind} {index} {columns}")
+    logger.info(f"Added index {table}.{index}")
+    return True
+
+def backfill_conversation_summaries(cursor):
+    """
+    Recompute message_count and last_message_preview for every conversation.
+
+    message_count is the number of stored message rows, so earlier versions of
+    a regenerated answer count too; every write path keeps it that way.
+    """
+    cursor.execute("""
+        UPDATE conversations c
+        JOIN (
+            SELECT conversation_id, COUNT(*) AS message_count
+            FROM messages GROUP BY conversation_id
+        ) counts ON counts.conversation_id = c.id
+        SET c.message_count = counts.message_count, c.updated_at = c.updated_at
+    """)
+    cursor.execute(f"""
+        UPDATE conversations c
+        JOIN (
+            -- Same whitespace collapsing and truncation as message_preview
+            SELECT conversation_id, TRIM(REGEXP_REPLACE(content, '[[:space:]]+', ' ')) AS preview
+            FROM (
+                SELECT conversation_id, content,
+                       ROW_NUMBER() OVER (PARTITION BY conversation_id ORDER BY created_at DESC, id DESC) AS position
+                FROM messages
+            ) ranked
+            WHERE position = 1
+        ) latest ON latest.conversation_id = c.id
+        SET c.last_message_preview = IF(
+                CHAR_LENGTH(latest.preview) > {PREVIEW_LENGTH},
+                CONCAT(LEFT(latest.preview, {PREVIEW_LENGTH - 3}), '...'),
+                latest.preview
+            ),
+            c.updated_at = c.updated_at
+    """)
+    logger.info("Backfilled conversation summaries")
+
+def backfill_message_tree(cursor):
+    """Chain pre-existing messages into one linear branch per conversation"""
+    cursor.execute("""
+        UPDATE messages m
+        JOIN (
+            SELECT id, LAG(id) OVER (PARTITION BY conversation_id ORDER BY created_at, id) AS parent_id
+            FROM messages
+        ) ordered ON ordered.id = m.id
+        SET m.parent_id = ordered.parent_id
+    """)
+    cursor.execute("""
+        UPDATE conversations c
+        JOIN (
+            SELECT conversation_id, id,
+                   ROW_NUMBER() OVER (PARTITION BY conversation_id ORDER BY created_at DESC, id DESC) AS position
+            FROM messages
+        ) latest ON latest.conversation_id = c.id AND latest.position = 1
+        SET c.active_leaf_id = latest.id, c.updated_at = c.updated_at
+    """)
+    logger.info("Backfilled message tree")
+
+def get_connection_pool():
+    """Return the connection pool, initializing the database on first use"""
+    if connection_pool is None:
+        with _init_lock:
+            if connection_pool is None and not init_database():
+                raise RuntimeError("Database is not available")
+    return connection_pool
+
+def check_database() -> bool:
+    """Readiness check: True if a pooled connection answers a trivial query"""
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            cursor.close()
+        return True
+    except Exception as e:
+        logger.warning(f"Database not ready: {str(e)}")
+        return False
+
 def init_database():
     """Initialize database and create tables if they don't exist"""
     global connection_pool
     try:
+        config = get_mysql_config()
+        
         # First, connect without database to create it
-        temp_config = MYSQL_CONFIG.copy()
+        temp_config = config.copy()
         del temp_config['database']
         
         connection = mysql.connector.connect(**temp_config)
         cursor = connection.cursor()
         
         # Create database if it doesn't exist
-        cursor.execute("CREATE DATABASE IF NOT EXISTS chatgpt_clone")
-        cursor.execute("USE chatgpt_clone")
+        cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{config['database']}`")
+        cursor.execute(f"USE `{config['database']}`")
         
         # Create conversations table
         cursor.execute("""
@@ -55,10 +221,24 @@ def init_database():
                 id VARCHAR(36) PRIMARY KEY,
                 title VARCHAR(255) NOT NULL,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                deleted_at TIMESTAMP NULL DEFAULT NULL,
+                message_count INT NOT NULL DEFAULT 0,
+                last_message_preview VARCHAR(255) NULL DEFAULT NULL,
+                version BIGINT NOT NULL DEFAULT 0,
+                active_leaf_id VARCHAR(36) NULL DEFAULT NULL,
+                archived_at TIMESTAMP NULL DEFAULT NULL,
+                restored_at TIMESTAMP NULL DEFAULT NULL,
+                INDEX idx_deleted_at (deleted_at),
+                INDEX idx_updated_at (updated_at),
+                FULLTEXT INDEX ft_title (title)
             )
         """)
         
+        # Soft deletes: older databases predate the deleted_at column
+        ensure_column(cursor, "conversations", "deleted_at", "TIMESTAMP NULL DEFAULT NULL")
+        ensure_index(cursor, "conversations", "idx_deleted_at", "(deleted_at)")
+        
         # Create messages table
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS messages (
@@ -67,11 +247,76 @@ def init_database():
                 role ENUM('user', 'assistant') NOT NULL,
                 content TEXT NOT NULL,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                parent_id VARCHAR(36) NULL DEFAULT NULL,
+                version INT NOT NULL DEFAULT 1,
                 FOREIGN KEY (conversation_id) REFERENCES conversations(id) ON DELETE CASCADE,
-                INDEX idx_conversation_id (conversation_id)
+                INDEX idx_conversation_id (conversation_id),
+                INDEX idx_parent_id (parent_id),
+                INDEX idx_conversation_created (conversation_id, created_at),
+                FULLTEXT INDEX ft_content (content)
+            )
+        """)
+        
+        # Ordered per-conversation reads (message lists, exports)
+        ensure_index(cursor, "messages", "idx_conversation_created", "(conversation_id, created_at)")
+        
+        # Denormalized sidebar summary, backfilled once when the columns are added
+        added_count = ensure_column(cursor, "conversations", "message_count", "INT NOT NULL DEFAULT 0")
+        added_preview = ensure_column(cursor, "conversations", "last_message_preview", "VARCHAR(255) NULL DEFAULT NULL")
+        if added_count or added_preview:
+            backfill_conversation_summaries(cursor)
+        
+        # Version counters backing ETags: one per conversation, one per list
+        ensure_column(cursor, "conversations", "version", "BIGINT NOT NULL DEFAULT 0")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS list_versions (
+                name VARCHAR(64) PRIMARY KEY,
+                version BIGINT NOT NULL DEFAULT 0
+            )
+        """)
+        cursor.execute("INSERT IGNORE INTO list_versions (name) VALUES (%s)", (CONVERSATION_LIST,))
+        
+        # Message version tree: parent pointers plus the active-branch leaf.
+        # Existing threads are linked up linearly once, in created_at order.
+        ensure_column(cursor, "conversations", "active_leaf_id", "VARCHAR(36) NULL DEFAULT NULL")
+        ensure_column(cursor, "messages", "version", "INT NOT NULL DEFAULT 1")
+        if ensure_column(cursor, "messages", "parent_id", "VARCHAR(36) NULL DEFAULT NULL"):
+            backfill_message_tree(cursor)
+        ensure_index(cursor, "messages", "idx_parent_id", "(parent_id)")
+        
+        # Cold-conversation archive: one compressed blob of messages per conversation
+        ensure_column(cursor, "conversations", "archived_at", "TIMESTAMP NULL DEFAULT NULL")
+        ensure_column(cursor, "conversations", "restored_at", "TIMESTAMP NULL DEFAULT NULL")
+        ensure_index(cursor, "conversations", "idx_updated_at", "(updated_at)")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS conversation_archives (
+                conversation_id VARCHAR(36) PRIMARY KEY,
+                message_count INT NOT NULL,
+                payload LONGBLOB NOT NULL,
+                archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (conversation_id) REFERENCES conversations(id) ON DELETE CASCADE
+            )
+        """)
+        
+        # Token and request accounting, written behind by the usage ledger.
+        # No foreign key: usage must outlive deleted conversations.
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS usage_ledger (
+                day DATE NOT NULL,
+                conversation_id VARCHAR(36) NOT NULL DEFAULT '',
+                model VARCHAR(64) NOT NULL,
+                requests INT NOT NULL DEFAULT 0,
+                prompt_tokens BIGINT NOT NULL DEFAULT 0,
+                completion_tokens BIGINT NOT NULL DEFAULT 0,
+                PRIMARY KEY (day, conversation_id, model),
+                INDEX idx_conversation_day (conversation_id, day)
             )
         """)
         
+        # Full-text indexes backing conversation search
+        ensure_index(cursor, "conversations", "ft_title", "(title)", kind="FULLTEXT INDEX")
+        ensure_index(cursor, "messages", "ft_content", "(content)", kind="FULLTEXT INDEX")
+        
         connection.commit()
         cursor.close()
         connection.close()
@@ -79,9 +324,9 @@ def init_database():
         # Now create connection pool
         connection_pool = pooling.MySQLConnectionPool(
             pool_name="chatgpt_pool",
-            pool_size=5,
+            pool_size=int(os.environ.get('CHAT_MYSQL_POOL_SIZE', 5)),
             pool_reset_session=True,
-            **MYSQL_CONFIG
+            **config
         )
         
         logger.info("Database initialized successfully")
@@ -0,0 +1,48 @@
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Dict, Set
+
+logger = logging.getLogger(__name__)
+
+class EventBroker:
+    """
+    In-process pub/sub for live conversation updates.
+
+    Topics are conversation ids, plus the "conversations" list topic for
+    events that change the sidebar (titles, deletions). Each subscriber owns
+    a bounded queue; publishing never blocks, and a subscriber that falls
+    behind loses events rather than slowing down the write path. Events only
+    reach clients connected to the same worker process.
+    """
+
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+
+    def create_queue(self) -> asyncio.Queue:
+        return asyncio.Queue(maxsize=self.queue_size)
+
+    def subscribe(self, queue: asyncio.Queue, topic: str):
+        self._subscribers[topic].add(queue)
+
+    def unsubscribe(self, queue: asyncio.Queue, topic: str = None):
+        """Remove a queue from one topic, or from every topic when none is given"""
+        topics = [topic] if topic else list(self._subscribers)
+        for name in topics:
+            subscribers = self._subscribers.get(name)
+            if subscribers is None:
+                continue
+            subscribers.discard(queue)
+            if not subscribers:
+                del self._subscribers[name]
+
+    def publish(self, topic: str, event: dict):
+        for queue in list(self._subscribers.get(topic, ())):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                logger.warning(f"Dropping {event.get('type')} event for slow subscriber on {topic}")
+
+# Create singleton instance
+event_broker = EventBroker()
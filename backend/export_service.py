@@ -0,0 +1,142 @@
+import json
+import logging
+from datetime import datetime, timezone
+from typing import Iterator, Optional
+from database import get_stream_connection
+from serialization import FETCH_SIZE, coalesce
+from archiver import load_archived_messages
+
+logger = logging.getLogger(__name__)
+
+# format -> (media type, file extension)
+EXPORT_FORMATS = {
+    "json": ("application/json", "json"),
+    "markdown": ("text/markdown", "md"),
+    "jsonl": ("application/x-ndjson", "jsonl"),
+}
+
+ROLE_LABELS = {"user": "User", "assistant": "Assistant"}
+
+def _iter_events(conversation_id: Optional[str] = None) -> Iterator[tuple]:
+    """
+    Stream ("conversation", dict) and ("message", dict) events.
+
+    Conversations are paged by primary key, and each one's messages are
+    read with their own query served in order by idx_conversation_created,
+    from an unbuffered cursor. Nothing is sorted server-side, and only
+    FETCH_SIZE rows (or one archived conversation) are held at a time.
+    Everything, archived blobs included, is read on one dedicated connection
+    so long downloads do not tie up the pool.
+    """
+    with get_stream_connection() as conn:
+        cursor = conn.cursor(dictionary=True)
+        try:
+            last_id = ""
+            while True:
+                if conversation_id:
+                    cursor.execute(
+                        "SELECT id, title, created_at, updated_at, archived_at FROM conversations "
+                        "WHERE id = %s AND deleted_at IS NULL",
+                        (conversation_id,)
+                    )
+                else:
+                    cursor.execute(
+                        "SELECT id, title, created_at, updated_at, archived_at FROM conversations "
+                        "WHERE id > %s AND deleted_at IS NULL ORDER BY id LIMIT %s",
+                        (last_id, FETCH_SIZE)
+                    )
+                conversations = cursor.fetchall()
+                for conversation in conversations:
+                    yield "conversation", {
+                        "id": conversation["id"],
+                        "title": conversation["title"],
+                        "created_at": conversation["created_at"].isoformat(),
+                        "updated_at": conversation["updated_at"].isoformat()
+                    }
+                    if conversation["archived_at"] is not None:
+                        # Archived messages live in one blob
+                        for message in load_archived_messages(conversation["id"], conn):
+                            yield "message", message
+                    yield from _iter_messages(cursor, conversation["id"])
+                if conversation_id or len(conversations) < FETCH_SIZE:
+                    break
+                last_id = conversations[-1]["id"]
+        finally:
+            # The client may disconnect mid-stream; drain the result so the
+            # connection can go back to the pool cleanly
+            if conn.unread_result:
+                conn.consume_results()
+            cursor.close()
+
+def _iter_messages(cursor, conversation_id: str) -> Iterator[tuple]:
+    cursor.execute(
+        "SELECT id, conversation_id, role, content, created_at, parent_id, version FROM messages "
+        "WHERE conversation_id = %s ORDER BY created_at ASC",
+        (conversation_id,)
+    )
+    while True:
+        rows = cursor.fetchmany(FETCH_SIZE)
+        if not rows:
+            break
+        for row in rows:
+            yield "message", {
+                "id": row["id"],
+                "conversation_id": row["conversation_id"],
+                "role": row["role"],
+                "content": row["content"],
+                "created_at": row["created_at"].isoformat(),
+                "parent_id": row["parent_id"],
+                "version": row["version"]
+            }
+
+def _write_json(events: Iterator[tuple]) -> Iterator[str]:
+    exported_at = datetime.now(timezone.utc).isoformat()
+    yield '{"exported_at": %s, "conversations": [' % json.dumps(exported_at)
+    first_conversation = True
+    first_message = True
+    for kind, item in events:
+        if kind == "conversation":
+            if not first_conversation:
+                yield "]}, "
+            first_conversation = False
+            first_message = True
+            yield json.dumps(item)[:-1] + ', "messages": ['
+        else:
+            yield json.dumps(item) if first_message else ", " + json.dumps(item)
+            first_message = False
+    if not first_conversation:
+        yield "]}"
+    yield "]}\n"
+
+def _write_jsonl(events: Iterator[tuple]) -> Iterator[str]:
+    for kind, item in events:
+        yield json.dumps({"type": kind, **item}) + "\n"
+
+def _write_markdown(events: Iterator[tuple]) -> Iterator[str]:
+    first_conversation = True
+    for kind, item in events:
+        if kind == "conversation":
+            if not first_conversation:
+                yield "---\n\n"
+            first_conversation = False
+            yield f"# {item['title']}\n\n*Created {item['created_at']}*\n\n"
+        else:
+            label = ROLE_LABELS.get(item["role"], item["role"])
+            if item["version"] > 1:
+                label += f" (version {item['version']})"
+            yield f"### {label}\n\n{item['content']}\n\n"
+
+_WRITERS = {
+    "json": _write_json,
+    "markdown": _write_markdown,
+    "jsonl": _write_jsonl,
+}
+
+def stream_export(export_format: str, conversation_id: Optional[str] = None) -> Iterator[bytes]:
+    """
+    Stream one conversation (or all of them) in the given format.
+
+    Output is coalesced into fixed-size byte chunks; memory use stays flat
+    regardless of how many messages are exported.
+    """
+    return coalesce(_WRITERS[export_format](_iter_events(conversation_id)))
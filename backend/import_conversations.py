@@ -0,0 +1,63 @@
+"""
+Bulk import conversations into the chat database
+
+Usage:
+    python import_conversations.py history.jsonl [more.zip ...]
+
+Accepts JSONL (typed records from the JSONL export, or one conversation per
+line), JSON exports, and ZIP archives containing either.
+"""
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from database import init_database
+from import_service import ConversationImporter, ImportFailed
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import conversations")
+    parser.add_argument("files", nargs="+", help="JSONL, JSON or ZIP files to import")
+    parser.add_argument("--batch-size", type=int, default=1000, help="rows per multi-row INSERT")
+    parser.add_argument("--transaction-rows", type=int, default=20000, help="rows per committed transaction")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    if not init_database():
+        print("❌ Could not initialize the database")
+        sys.exit(1)
+
+    started = time.monotonic()
+
+    def report(stats):
+        elapsed = time.monotonic() - started
+        rate = stats["messages"] / elapsed if elapsed else 0
+        print(
+            f"   {stats['conversations']} conversations, {stats['messages']} messages "
+            f"({stats['skipped']} skipped) - {rate:,.0f} messages/s",
+            flush=True
+        )
+
+    importer = ConversationImporter(
+        batch_size=args.batch_size,
+        transaction_rows=args.transaction_rows,
+        progress=report
+    )
+    for path in args.files:
+        print(f"📥 Importing {path}")
+        try:
+            with open(path, "rb") as fileobj:
+                stats = importer.import_file(fileobj, path)
+        except ImportFailed as e:
+            committed = e.committed
+            print(f"❌ {path}: {e}")
+            print(f"   Already committed: {committed['conversations']} conversations, {committed['messages']} messages")
+            sys.exit(1)
+        print(f"✅ {path}: {stats['conversations']} conversations, {stats['messages']} messages")
+
+    print(f"🎉 Done in {time.monotonic() - started:.1f}s")
+
+if __name__ == "__main__":
+    main()
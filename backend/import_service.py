@@ -0,0 +1,284 @@
+import io
+import json
+import logging
+import uuid
+import zipfile
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterator, Optional
+from database import bump_list_version, get_db_connection, message_preview
+
+logger = logging.getLogger(__name__)
+
+ROLES = ("user", "assistant")
+
+class ImportFailed(Exception):
+    """
+    An import stopped partway. `committed` holds the stats of the batches that
+    were already committed and stay in the database; the original error is
+    chained as __cause__ (a ValueError means the input was invalid).
+    """
+
+    def __init__(self, error: Exception, committed: Dict[str, int]):
+        super().__init__(str(error))
+        self.committed = committed
+
+def _parse_timestamp(value) -> datetime:
+    """Parse an ISO timestamp into a naive UTC datetime, defaulting to now"""
+    if isinstance(value, str):
+        try:
+            parsed = datetime.fromisoformat(value)
+            if parsed.tzinfo is not None:
+                parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+            return parsed
+        except ValueError:
+            pass
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def _conversation_events(doc: dict) -> Iterator[tuple]:
+    """Events for one nested conversation document (our JSON export or the old Mongo export)"""
+    if not isinstance(doc, dict):
+        raise ValueError("Expected a conversation object")
+    header = doc.get("session") or doc
+    messages = doc.get("messages") or []
+    if not isinstance(header, dict) or not isinstance(messages, list):
+        raise ValueError("Expected a conversation object with a list of messages")
+    yield "conversation", header
+    for message in messages:
+        if not isinstance(message, dict):
+            raise ValueError("Expected each message to be an object")
+        yield "message", message
+
+def _document_events(doc) -> Iterator[tuple]:
+    if isinstance(doc, list):
+        for item in doc:
+            yield from _conversation_events(item)
+    elif not isinstance(doc, dict):
+        raise ValueError("Expected a conversation object or a list of them")
+    elif "conversations" in doc:
+        if not isinstance(doc["conversations"], list):
+            raise ValueError("Expected \"conversations\" to be a list")
+        for item in doc["conversations"]:
+            yield from _conversation_events(item)
+    else:
+        yield from _conversation_events(doc)
+
+def _jsonl_events(lines) -> Iterator[tuple]:
+    """
+    Events for a JSONL stream. Each line is either a typed record as written by
+    the JSONL export ({"type": "conversation" | "message", ...}) or a whole
+    nested conversation document.
+    """
+    for line_number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON on line {line_number}: {e}")
+        if not isinstance(record, dict):
+            raise ValueError(f"Expected an object on line {line_number}")
+        record_type = record.get("type")
+        if record_type in ("conversation", "message"):
+            yield record_type, record
+        else:
+            yield from _conversation_events(record)
+
+def iter_import_events(fileobj, filename: str) -> Iterator[tuple]:
+    """Yield ("conversation", dict) / ("message", dict) events from a JSONL, JSON or ZIP upload"""
+    name = (filename or "").lower()
+    if name.endswith(".zip"):
+        try:
+            with zipfile.ZipFile(fileobj) as archive:
+                for member in archive.namelist():
+                    member_name = member.lower()
+                    if member_name.endswith((".jsonl", ".ndjson")):
+                        with archive.open(member) as raw:
+                            yield from _jsonl_events(io.TextIOWrapper(raw, encoding="utf-8"))
+                    elif member_name.endswith(".json"):
+                        with archive.open(member) as raw:
+                            yield from _document_events(json.load(raw))
+        except zipfile.BadZipFile as e:
+            raise ValueError(f"Invalid ZIP archive: {e}")
+    elif name.endswith(".json"):
+        yield from _document_events(json.load(fileobj))
+    else:
+        yield from _jsonl_events(io.TextIOWrapper(fileobj, encoding="utf-8"))
+
+class ConversationImporter:
+    """
+    Bulk-load conversations through batched multi-row INSERTs.
+
+    Rows are buffered and written `batch_size` at a time with executemany,
+    which the MySQL connector rewrites into a single multi-row INSERT. The
+    surrounding transaction is committed every `transaction_rows` rows so
+    no single transaction grows unbounded. Imported conversations and
+    messages always get fresh ids so they can never collide with existing
+    ones; parent pointers are remapped within each conversation, and
+    messages without one are chained in file order. A parent that only
+    appears later in the file is linked once the whole conversation has
+    been read.
+    """
+
+    def __init__(self, batch_size=1000, transaction_rows=20000, progress: Optional[Callable[[Dict], None]] = None):
+        self.batch_size = batch_size
+        self.transaction_rows = transaction_rows
+        self.progress = progress
+
+    def import_file(self, fileobj, filename: str) -> Dict[str, int]:
+        return self.import_events(iter_import_events(fileobj, filename))
+
+    def import_events(self, events: Iterator[tuple]) -> Dict[str, int]:
+        stats = {"conversations": 0, "messages": 0, "skipped": 0}
+        committed = dict(stats)
+        id_map = {}
+        message_id_map = {}
+        latest = {}
+        parents = {}
+        unresolved = []
+        last_message_ids = {}
+        current_id = None
+        conversation_rows = []
+        message_rows = []
+        uncommitted = 0
+
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                for kind, record in events:
+                    if kind == "conversation":
+                        if unresolved:
+                            uncommitted += self._resolve_parents(
+                                cursor, conversation_rows, message_rows, latest, unresolved, message_id_map, parents
+                            )
+                        current_id = str(uuid.uuid4())
+                        message_id_map = {}
+                        parents = {}
+                        unresolved = []
+                        if record.get("id"):
+                            id_map[record["id"]] = current_id
+                        conversation_rows.append((
+                            current_id,
+                            (record.get("title") or "Imported chat")[:255],
+                            _parse_timestamp(record.get("created_at")),
+                            _parse_timestamp(record.get("updated_at") or record.get("created_at"))
+                        ))
+                        stats["conversations"] += 1
+                    else:
+                        source_id = record.get("conversation_id") or record.get("session_id")
+                        conversation_id = id_map.get(source_id) if source_id else current_id
+                        if conversation_id is None or record.get("role") not in ROLES or not isinstance(record.get("content"), str):
+                            stats["skipped"] += 1
+                            continue
+                        message_id = str(uuid.uuid4())
+                        source_parent_id = record.get("parent_id")
+                        if "parent_id" in record and source_parent_id is None:
+                            parent_id = None
+                        elif source_parent_id in message_id_map:
+                            parent_id = message_id_map[source_parent_id]
+                        else:
+                            # Unknown or not yet seen: chain in file order for now
+                            parent_id = last_message_ids.get(conversation_id)
+                            if source_parent_id is not None:
+                                unresolved.append((message_id, source_parent_id))
+                        if record.get("id"):
+                            message_id_map[record["id"]] = message_id
+                        parents[message_id] = parent_id
+                        last_message_ids[conversation_id] = message_id
+                        message_rows.append((
+                            message_id,
+                            conversation_id,
+                            record["role"],
+                            record["content"],
+                            _parse_timestamp(record.get("created_at")),
+                            parent_id,
+                            int(record.get("version") or 1)
+                        ))
+                        stats["messages"] += 1
+
+                    if len(conversation_rows) + len(message_rows) >= self.batch_size:
+                        uncommitted += self._flush(cursor, conversation_rows, message_rows, latest)
+                        if uncommitted >= self.transaction_rows:
+                            bump_list_version(cursor)
+                            conn.commit()
+                            committed = dict(stats)
+                            uncommitted = 0
+                            self._report(stats)
+
+                if unresolved:
+                    self._resolve_parents(cursor, conversation_rows, message_rows, latest, unresolved, message_id_map, parents)
+                self._flush(cursor, conversation_rows, message_rows, latest)
+                bump_list_version(cursor)
+                conn.commit()
+                self._report(stats)
+            except Exception as e:
+                conn.rollback()
+                raise ImportFailed(e, committed) from e
+            finally:
+                cursor.close()
+
+        return stats
+
+    def _flush(self, cursor, conversation_rows: list, message_rows: list, latest: dict) -> int:
+        # Conversations first so the messages' foreign keys resolve
+        written = len(conversation_rows) + len(message_rows)
+        if conversation_rows:
+            cursor.executemany(
+                "INSERT INTO conversations (id, title, created_at, updated_at) VALUES (%s, %s, %s, %s)",
+                conversation_rows
+            )
+            conversation_rows.clear()
+        if message_rows:
+            cursor.executemany(
+                "INSERT INTO messages (id, conversation_id, role, content, created_at, parent_id, version) "
+                "VALUES (%s, %s, %s, %s, %s, %s, %s)",
+                message_rows
+            )
+            # Keep the sidebar summary and active branch in step with the batch.
+            # The newest message of the conversation so far, across all batches
+            # (`latest`), becomes the active leaf, so a file that is not in
+            # time order cannot leave an older message as the leaf
+            counts = {}
+            for message_id, conversation_id, _, content, created_at, _, _ in message_rows:
+                counts[conversation_id] = counts.get(conversation_id, 0) + 1
+                newest = latest.get(conversation_id)
+                if newest is None or created_at >= newest[0]:
+                    latest[conversation_id] = (created_at, message_id, message_preview(content))
+            cursor.executemany(
+                "UPDATE conversations SET message_count = message_count + %s, last_message_preview = %s, "
+                "active_leaf_id = %s, version = version + 1, updated_at = updated_at WHERE id = %s",
+                [
+                    (count, latest[conversation_id][2], latest[conversation_id][1], conversation_id)
+                    for conversation_id, count in counts.items()
+                ]
+            )
+            message_rows.clear()
+        return written
+
+    def _resolve_parents(self, cursor, conversation_rows: list, message_rows: list, latest: dict,
+                         unresolved: list, message_id_map: dict, parents: dict) -> int:
+        """Point messages at parents that appeared later in their conversation"""
+        written = self._flush(cursor, conversation_rows, message_rows, latest)
+        updates = []
+        for message_id, source_parent_id in unresolved:
+            parent_id = message_id_map.get(source_parent_id)
+            if parent_id is None:
+                continue
+            # Keep the file-order parent if the declared one would form a cycle
+            ancestor = parent_id
+            while ancestor is not None and ancestor != message_id:
+                ancestor = parents.get(ancestor)
+            if ancestor is None:
+                parents[message_id] = parent_id
+                updates.append((parent_id, message_id))
+        if updates:
+            cursor.executemany("UPDATE messages SET parent_id = %s WHERE id = %s", updates)
+        return written + len(updates)
+
+    def _report(self, stats: Dict[str, int]):
+        logger.info(
+            f"Imported {stats['conversations']} conversations, "
+            f"{stats['messages']} messages ({stats['skipped']} skipped)"
+        )
+        if self.progress:
+            self.progress(dict(stats))
@@ -0,0 +1,35 @@
+"""
+Messages form a tree: each message points at its parent, and regenerating
+an answer appends a sibling with the next version number instead of
+replacing it. conversations.active_leaf_id marks the branch being shown;
+walking parent pointers up from that leaf yields the visible thread.
+"""
+
+# Upper bound for the recursive walk; MySQL's default of 1000 would cap thread length
+MAX_BRANCH_DEPTH = 100000
+
+MESSAGE_COLUMNS = "id, conversation_id, role, content, created_at, parent_id, version"
+
+def active_branch_query(columns: str = MESSAGE_COLUMNS) -> str:
+    """Recursive CTE selecting the branch ending at a leaf id, root first"""
+    return f"""
+        WITH RECURSIVE branch AS (
+            SELECT {MESSAGE_COLUMNS}, 0 AS depth FROM messages WHERE id = %s
+            UNION ALL
+            SELECT {", ".join("m." + c.strip() for c in MESSAGE_COLUMNS.split(","))}, branch.depth + 1
+            FROM messages m JOIN branch ON m.id = branch.parent_id
+        )
+        SELECT {columns} FROM branch ORDER BY depth DESC
+    """
+
+def prepare_branch_walk(cursor):
+    """Lift the recursion limit for this session; pooled sessions are reset on checkout"""
+    cursor.execute(f"SET SESSION cte_max_recursion_depth = {MAX_BRANCH_DEPTH}")
+
+def fetch_active_branch(cursor, leaf_id, columns: str = "role, content") -> list:
+    """Return the messages on the branch ending at leaf_id, oldest first"""
+    if leaf_id is None:
+        return []
+    prepare_branch_walk(cursor)
+    cursor.execute(active_branch_query(columns), (leaf_id,))
+    return cursor.fetchall()
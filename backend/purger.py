@@ -0,0 +1,118 @@
+import asyncio
+import logging
+from database import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+class ConversationPurger:
+    """
+    Background worker that removes soft-deleted conversations.
+
+    Deleting a conversation only stamps `deleted_at`; this worker then removes
+    its messages in small batches, each in its own short transaction, and
+    sleeps between batches so other writers are never stalled behind one
+    large cascading delete. The conversation row itself is dropped last.
+    Pending conversations are taken `page_size` at a time until none are
+    left; only then does the worker idle.
+    """
+
+    def __init__(self, batch_size=500, batch_delay=0.05, page_size=100, idle_interval=60.0):
+        self.batch_size = batch_size
+        self.page_size = page_size
+        self.batch_delay = batch_delay
+        self.idle_interval = idle_interval
+        self._wakeup = None
+        self._task = None
+
+    def start(self):
+        """Start the purge loop on the running event loop"""
+        if self._task is None or self._task.done():
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+            logger.info("Conversation purger started")
+
+    async def stop(self):
+        """Cancel the purge loop and wait for it to exit"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            logger.info("Conversation purger stopped")
+
+    def wake(self):
+        """Signal that a conversation was just soft-deleted"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            try:
+                while True:
+                    conversation_ids = await asyncio.to_thread(self._pending_conversations)
+                    for conversation_id in conversation_ids:
+                        await self.purge_conversation(conversation_id)
+                    if len(conversation_ids) < self.page_size:
+                        break
+                    await asyncio.sleep(self.batch_delay)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error purging conversations: {str(e)}")
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.idle_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def purge_conversation(self, conversation_id: str):
+        """Delete a soft-deleted conversation's messages batch by batch, then the row"""
+        total = 0
+        while True:
+            deleted = await asyncio.to_thread(self._delete_message_batch, conversation_id)
+            total += deleted
+            if deleted < self.batch_size:
+                break
+            await asyncio.sleep(self.batch_delay)
+
+        await asyncio.to_thread(self._delete_conversation_row, conversation_id)
+        logger.info(f"Purged conversation {conversation_id} ({total} messages)")
+
+    def _pending_conversations(self):
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT id FROM conversations WHERE deleted_at IS NOT NULL ORDER BY deleted_at ASC LIMIT %s",
+                (self.page_size,)
+            )
+            rows = cursor.fetchall()
+            cursor.close()
+            return [row[0] for row in rows]
+
+    def _delete_message_batch(self, conversation_id: str) -> int:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "DELETE FROM messages WHERE conversation_id = %s LIMIT %s",
+                (conversation_id, self.batch_size)
+            )
+            deleted = cursor.rowcount
+            conn.commit()
+            cursor.close()
+            return deleted
+
+    def _delete_conversation_row(self, conversation_id: str):
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "DELETE FROM conversations WHERE id = %s AND deleted_at IS NOT NULL",
+                (conversation_id,)
+            )
+            conn.commit()
+            cursor.close()
+
+# Create singleton instance
+conversation_purger = ConversationPurger()
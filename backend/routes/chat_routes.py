@@ -1,11 +1,21 @@
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, File, HTTPException, Query, Request, Response, UploadFile, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional
 import uuid
-from datetime import datetime
+import asyncio
+from datetime import date, datetime
 import logging
-from database import get_db_connection
+import re
+from database import CONVERSATION_LIST, bump_list_version, get_db_connection, message_preview
 from chatgpt_service import chatgpt_service
+from purger import conversation_purger
+from archiver import conversation_archiver, restore_conversation
+from export_service import EXPORT_FORMATS, stream_export
+from import_service import ConversationImporter, ImportFailed
+from events import event_broker
+from serialization import stream_message_list
+from message_tree import MESSAGE_COLUMNS, fetch_active_branch
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api", tags=["chat"])
@@ -19,6 +29,8 @@ class ConversationResponse(BaseModel):
     title: str
     created_at: str
     updated_at: str
+    message_count: Optional[int] = None
+    last_message_preview: Optional[str] = None
 
 class MessageCreate(BaseModel):
     content: str
@@ -29,6 +41,8 @@ class MessageResponse(BaseModel):
     role: str
     content: str
     created_at: str
+    parent_id: Optional[str] = None
+    version: int = 1
 
 class ChatResponse(BaseModel):
     user_message: MessageResponse
@@ -37,16 +51,197 @@ class ChatResponse(BaseModel):
 class RegenerateRequest(BaseModel):
     message_id: str
 
+class SearchResult(BaseModel):
+    conversation_id: str
+    title: str
+    updated_at: str
+    score: float
+    snippet: Optional[str] = None
+
+class SearchResponse(BaseModel):
+    query: str
+    results: List[SearchResult]
+    limit: int
+    offset: int
+    has_more: bool
+
+class UsageTotals(BaseModel):
+    requests: int
+    prompt_tokens: int
+    completion_tokens: int
+    total_tokens: int
+
+class UsageDay(UsageTotals):
+    day: str
+
+class UsageResponse(BaseModel):
+    conversation_id: Optional[str] = None
+    days: List[UsageDay]
+    totals: UsageTotals
+
+class ImportResponse(BaseModel):
+    conversations: int
+    messages: int
+    skipped: int
+
+def _not_modified(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """Tag the response with an ETag; return a 304 if the client already has it"""
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    response.headers.update(headers)
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return None
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    if "*" in candidates or etag in candidates:
+        return Response(status_code=304, headers=headers)
+    return None
+
+def _serialize_message(row: dict) -> dict:
+    return {
+        "id": row["id"],
+        "conversation_id": row["conversation_id"],
+        "role": row["role"],
+        "content": row["content"],
+        "created_at": row["created_at"].isoformat(),
+        "parent_id": row["parent_id"],
+        "version": row["version"]
+    }
+
+async def _restore_if_archived(conn, conversation: dict):
+    """Bring an archived conversation's messages back before they are read"""
+    if conversation["archived_at"] is not None:
+        await asyncio.to_thread(restore_conversation, conversation["id"])
+        # End the current snapshot so this connection sees the restored rows
+        conn.commit()
+
+def _lock_active_leaf(conn, cursor, conversation_id: str) -> Optional[str]:
+    """
+    Start a transaction holding the conversation row and return its current
+    active leaf. Writers that move the leaf go through this, so concurrent
+    sends and regenerates queue up instead of overwriting each other.
+    """
+    # End the current snapshot so reads after the lock see the latest branch
+    conn.commit()
+    cursor.execute("SELECT active_leaf_id FROM conversations WHERE id = %s FOR UPDATE", (conversation_id,))
+    row = cursor.fetchone()
+    return row["active_leaf_id"] if row else None
+
+def _publish_conversation_event(conversation_id: str, event: dict):
+    """Push an event that changes a conversation as a whole to its viewers and the sidebar"""
+    event_broker.publish(conversation_id, event)
+    event_broker.publish(CONVERSATION_LIST, event)
+
+def _publish_summary(cursor, conversation_id: str):
+    """Push a conversation's sidebar fields after a commit changed them; `cursor` is a dictionary cursor"""
+    cursor.execute(
+        "SELECT updated_at, message_count, last_message_preview FROM conversations WHERE id = %s",
+        (conversation_id,)
+    )
+    summary = cursor.fetchone()
+    if summary:
+        _publish_conversation_event(conversation_id, {
+            "type": "conversation.updated",
+            "conversation_id": conversation_id,
+            "updated_at": summary["updated_at"].isoformat(),
+            "message_count": summary["message_count"],
+            "last_message_preview": summary["last_message_preview"]
+        })
+
+# Strong references to fire-and-forget tasks so they are not garbage collected mid-flight
+_background_tasks = set()
+
+def _spawn(coro):
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+async def _generate_title(conversation_id: str, first_message: str):
+    """Title a new conversation off the request path and push the result to subscribers"""
+    try:
+        new_title = await chatgpt_service.generate_title(first_message, conversation_id)
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "UPDATE conversations SET title = %s, version = version + 1 WHERE id = %s AND title = 'New chat' AND deleted_at IS NULL",
+                (new_title, conversation_id)
+            )
+            updated = cursor.rowcount
+            if updated:
+                bump_list_version(cursor)
+            conn.commit()
+            cursor.close()
+        
+        if updated:
+            _publish_conversation_event(conversation_id, {
+                "type": "conversation.updated",
+                "conversation_id": conversation_id,
+                "title": new_title
+            })
+    except Exception as e:
+        logger.error(f"Error generating title: {str(e)}")
+
+SNIPPET_LENGTH = 160
+
+# Highest-scoring title and message matches considered per search. Candidates
+# are read from each table alone, so InnoDB can stop after the top rows of
+# ORDER BY MATCH ... LIMIT; they are over-fetched by SEARCH_OVERFETCH to leave
+# room for deleted conversations, which are dropped afterwards.
+SEARCH_CANDIDATES = 1000
+SEARCH_OVERFETCH = 2
+
+def _make_snippet(content: str, query: str) -> str:
+    """Cut a window of the message around the first matching query term"""
+    terms = [t for t in re.findall(r"\w+", query) if len(t) > 1]
+    start = 0
+    if terms:
+        match = re.search("|".join(re.escape(t) for t in terms), content, re.IGNORECASE)
+        if match:
+            start = max(0, match.start() - SNIPPET_LENGTH // 4)
+    snippet = content[start:start + SNIPPET_LENGTH].strip()
+    if start > 0:
+        snippet = "..." + snippet
+    if start + SNIPPET_LENGTH < len(content):
+        snippet = snippet + "..."
+    return snippet
+
+# Lifecycle, registered by the app factory in chat_app.py
+
+async def start_background_workers():
+    conversation_purger.start()
+    conversation_archiver.start()
+    chatgpt_service.usage.start()
+
+async def stop_background_workers():
+    await conversation_purger.stop()
+    await conversation_archiver.stop()
+    await chatgpt_service.usage.stop()
+
 # Routes
 
-@router.get("/conversations", response_model=List[ConversationResponse])
-async def get_conversations():
-    """Get all conversations ordered by most recent"""
+@router.get("/conversations", response_model=List[ConversationResponse], response_model_exclude_unset=True)
+async def get_conversations(request: Request, response: Response, include_preview: bool = False):
+    """Get all conversations ordered by most recent
+    
+    With include_preview, each conversation also carries its message count and
+    an excerpt of its last message, read from columns maintained on write.
+    Answers If-None-Match with 304 when the list version is unchanged.
+    """
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor(dictionary=True)
+            cursor.execute("SELECT version FROM list_versions WHERE name = %s", (CONVERSATION_LIST,))
+            list_version = cursor.fetchone()
+            etag = f'W/"conversations-{list_version["version"] if list_version else 0}{"-preview" if include_preview else ""}"'
+            not_modified = _not_modified(request, response, etag)
+            if not_modified:
+                cursor.close()
+                return not_modified
+            
+            columns = "id, title, created_at, updated_at"
+            if include_preview:
+                columns += ", message_count, last_message_preview"
             cursor.execute(
-                "SELECT id, title, created_at, updated_at FROM conversations ORDER BY updated_at DESC"
+                f"SELECT {columns} FROM conversations WHERE deleted_at IS NULL ORDER BY updated_at DESC"
             )
             conversations = cursor.fetchall()
             cursor.close()
@@ -73,6 +268,7 @@ async def create_conversation(conversation: ConversationCreate):
                 "INSERT INTO conversations (id, title) VALUES (%s, %s)",
                 (conversation_id, conversation.title)
             )
+            bump_list_version(cursor)
             conn.commit()
             
             # Fetch the created conversation
@@ -93,39 +289,227 @@ async def create_conversation(conversation: ConversationCreate):
         logger.error(f"Error creating conversation: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/conversations/search", response_model=SearchResponse)
+async def search_conversations(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=50),
+    offset: int = Query(0, ge=0)
+):
+    """Full-text search over conversation titles and message content
+    
+    Conversations are ranked by title relevance (weighted double) plus their
+    best-matching message, using the FULLTEXT indexes on both tables. Each
+    side is cut to its highest-scoring rows by a single-table MATCH query
+    before any join or grouping, so common terms stay cheap; pages beyond
+    that candidate set come back empty. Message text of archived conversations is not indexed, so those
+    match on their title only until they are restored.
+    """
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute(
+                """
+                SELECT c.id, c.title, c.updated_at, hits.score, hits.message_id
+                FROM (
+                    SELECT conversation_id, SUM(score) AS score, MAX(message_id) AS message_id FROM (
+                        (
+                            SELECT id AS conversation_id,
+                                   MATCH(title) AGAINST (%s IN NATURAL LANGUAGE MODE) * 2 AS score,
+                                   NULL AS message_id
+                            FROM conversations
+                            WHERE MATCH(title) AGAINST (%s IN NATURAL LANGUAGE MODE)
+                            ORDER BY score DESC
+                            LIMIT %s
+                        )
+                        UNION ALL
+                        SELECT conversation_id, score, message_id FROM (
+                            SELECT conversation_id, score, message_id,
+                                   ROW_NUMBER() OVER (PARTITION BY conversation_id ORDER BY score DESC) AS position
+                            FROM (
+                                SELECT conversation_id, id AS message_id,
+                                       MATCH(content) AGAINST (%s IN NATURAL LANGUAGE MODE) AS score
+                                FROM messages
+                                WHERE MATCH(content) AGAINST (%s IN NATURAL LANGUAGE MODE)
+                                ORDER BY score DESC
+                                LIMIT %s
+                            ) candidates
+                        ) ranked
+                        WHERE position = 1
+                    ) matches
+                    GROUP BY conversation_id
+                ) hits
+                JOIN conversations c ON c.id = hits.conversation_id AND c.deleted_at IS NULL
+                ORDER BY hits.score DESC, c.updated_at DESC
+                LIMIT %s OFFSET %s
+                """,
+                (q, q, SEARCH_CANDIDATES * SEARCH_OVERFETCH, q, q, SEARCH_CANDIDATES * SEARCH_OVERFETCH, limit + 1, offset)
+            )
+            hits = cursor.fetchall()
+            has_more = len(hits) > limit
+            hits = hits[:limit]
+            
+            # Snippets come from each hit's best message, fetched in one lookup
+            contents = {}
+            message_ids = [hit["message_id"] for hit in hits if hit["message_id"]]
+            if message_ids:
+                placeholders = ", ".join(["%s"] * len(message_ids))
+                cursor.execute(
+                    f"SELECT id, content FROM messages WHERE id IN ({placeholders})",
+                    tuple(message_ids)
+                )
+                contents = {row["id"]: row["content"] for row in cursor.fetchall()}
+            cursor.close()
+            
+            results = []
+            for hit in hits:
+                content = contents.get(hit["message_id"])
+                results.append({
+                    "conversation_id": hit["id"],
+                    "title": hit["title"],
+                    "updated_at": hit["updated_at"].isoformat(),
+                    "score": float(hit["score"]),
+                    "snippet": _make_snippet(content, q) if content else None
+                })
+            
+            return {
+                "query": q,
+                "results": results,
+                "limit": limit,
+                "offset": offset,
+                "has_more": has_more
+            }
+    except Exception as e:
+        logger.error(f"Error searching conversations: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+def _export_response(export_format: str, conversation_id: Optional[str] = None) -> StreamingResponse:
+    media_type, extension = EXPORT_FORMATS[export_format]
+    filename = f"chat_{conversation_id}.{extension}" if conversation_id else f"chats.{extension}"
+    return StreamingResponse(
+        stream_export(export_format, conversation_id),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+@router.get("/conversations/export")
+async def export_conversations(format: str = Query("json", pattern="^(json|markdown|jsonl)$")):
+    """Stream every conversation as JSON, Markdown or JSONL"""
+    return _export_response(format)
+
+@router.get("/conversations/{conversation_id}/export")
+async def export_conversation(conversation_id: str, format: str = Query("json", pattern="^(json|markdown|jsonl)$")):
+    """Stream a single conversation as JSON, Markdown or JSONL
+    
+    Archived conversations are exported straight from their archive, the same
+    way the full export does, so exporting does not restore them.
+    """
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT id FROM conversations WHERE id = %s AND deleted_at IS NULL",
+                (conversation_id,)
+            )
+            conversation = cursor.fetchone()
+            cursor.close()
+    except Exception as e:
+        logger.error(f"Error exporting conversation: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    if not conversation:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    
+    return _export_response(format, conversation_id)
+
+@router.post("/conversations/import", response_model=ImportResponse)
+async def import_conversations(file: UploadFile = File(...)):
+    """Bulk import conversations from a JSONL, JSON or ZIP archive upload
+    
+    Batches are committed as the import goes, so a failure partway leaves
+    earlier batches in place; the error detail reports what was committed.
+    """
+    try:
+        importer = ConversationImporter()
+        return await asyncio.to_thread(importer.import_file, file.file, file.filename)
+    except ImportFailed as e:
+        invalid = isinstance(e.__cause__, ValueError)
+        if not invalid:
+            logger.error(f"Error importing conversations: {str(e)}")
+        raise HTTPException(
+            status_code=400 if invalid else 500,
+            detail={"error": str(e), "committed": e.committed}
+        )
+    except Exception as e:
+        logger.error(f"Error importing conversations: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.delete("/conversations/{conversation_id}")
 async def delete_conversation(conversation_id: str):
-    """Delete a conversation and all its messages"""
+    """Delete a conversation and all its messages
+    
+    The conversation is hidden immediately; its messages are removed in the
+    background by the conversation purger.
+    """
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("DELETE FROM conversations WHERE id = %s", (conversation_id,))
+            cursor.execute(
+                "UPDATE conversations SET deleted_at = CURRENT_TIMESTAMP, updated_at = updated_at WHERE id = %s AND deleted_at IS NULL",
+                (conversation_id,)
+            )
+            deleted = cursor.rowcount
+            if deleted:
+                bump_list_version(cursor)
             conn.commit()
             cursor.close()
-            
-            return {"message": "Conversation deleted successfully"}
+        
+        # Unknown or already-deleted ids change nothing
+        if deleted:
+            conversation_purger.wake()
+            _publish_conversation_event(conversation_id, {
+                "type": "conversation.deleted",
+                "conversation_id": conversation_id
+            })
+        return {"message": "Conversation deleted successfully"}
     except Exception as e:
         logger.error(f"Error deleting conversation: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/conversations/{conversation_id}/messages", response_model=List[MessageResponse])
-async def get_messages(conversation_id: str):
-    """Get all messages for a conversation"""
+async def get_messages(conversation_id: str, request: Request, response: Response):
+    """Get the messages on a conversation's active branch
+    
+    Answers If-None-Match with 304 from the conversation's version alone,
+    without reading the messages table. Otherwise rows are streamed from the
+    cursor straight into compact JSON, bypassing response-model validation;
+    the wire format is the same List[MessageResponse].
+    """
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor(dictionary=True)
             cursor.execute(
-                "SELECT id, conversation_id, role, content, created_at FROM messages WHERE conversation_id = %s ORDER BY created_at ASC",
+                "SELECT id, version, active_leaf_id, archived_at FROM conversations WHERE id = %s AND deleted_at IS NULL",
                 (conversation_id,)
             )
-            messages = cursor.fetchall()
-            cursor.close()
+            conversation = cursor.fetchone()
+            if not conversation:
+                raise HTTPException(status_code=404, detail="Conversation not found")
             
-            # Convert datetime to string
-            for msg in messages:
-                msg['created_at'] = msg['created_at'].isoformat()
+            etag = f'W/"messages-{conversation_id}-{conversation["version"]}"'
+            not_modified = _not_modified(request, response, etag)
+            cursor.close()
+            if not_modified:
+                return not_modified
             
-            return messages
+            await _restore_if_archived(conn, conversation)
+        
+        return StreamingResponse(
+            stream_message_list(conversation["active_leaf_id"]),
+            media_type="application/json",
+            headers=dict(response.headers)
+        )
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching messages: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -137,33 +521,42 @@ async def send_message(conversation_id: str, message: MessageCreate):
         # First, check if conversation exists
         with get_db_connection() as conn:
             cursor = conn.cursor(dictionary=True)
-            cursor.execute("SELECT id, title FROM conversations WHERE id = %s", (conversation_id,))
+            cursor.execute(
+                "SELECT id, title, active_leaf_id, archived_at FROM conversations WHERE id = %s AND deleted_at IS NULL",
+                (conversation_id,)
+            )
             conversation = cursor.fetchone()
             
             if not conversation:
                 raise HTTPException(status_code=404, detail="Conversation not found")
             
-            # Get conversation history
-            cursor.execute(
-                "SELECT role, content FROM messages WHERE conversation_id = %s ORDER BY created_at ASC",
-                (conversation_id,)
-            )
-            history = cursor.fetchall()
+            await _restore_if_archived(conn, conversation)
+            leaf_id = _lock_active_leaf(conn, cursor, conversation_id)
+            
+            # Get conversation history along the active branch
+            history = fetch_active_branch(cursor, leaf_id)
             
-            # Create user message
+            # Create user message as a child of the current leaf
             user_message_id = str(uuid.uuid4())
             cursor.execute(
-                "INSERT INTO messages (id, conversation_id, role, content) VALUES (%s, %s, %s, %s)",
-                (user_message_id, conversation_id, "user", message.content)
+                "INSERT INTO messages (id, conversation_id, role, content, parent_id) VALUES (%s, %s, %s, %s, %s)",
+                (user_message_id, conversation_id, "user", message.content, leaf_id)
             )
+            cursor.execute(
+                "UPDATE conversations SET active_leaf_id = %s, message_count = message_count + 1, last_message_preview = %s, version = version + 1 WHERE id = %s",
+                (user_message_id, message_preview(message.content), conversation_id)
+            )
+            bump_list_version(cursor)
             conn.commit()
             
             # Fetch created user message
             cursor.execute(
-                "SELECT id, conversation_id, role, content, created_at FROM messages WHERE id = %s",
+                f"SELECT {MESSAGE_COLUMNS} FROM messages WHERE id = %s",
                 (user_message_id,)
             )
-            user_msg = cursor.fetchone()
+            user_msg = _serialize_message(cursor.fetchone())
+            event_broker.publish(conversation_id, {"type": "message.created", "message": user_msg})
+            _publish_summary(cursor, conversation_id)
             
             # Prepare messages for AI
             ai_messages = []
@@ -172,56 +565,48 @@ async def send_message(conversation_id: str, message: MessageCreate):
             ai_messages.append({"role": "user", "content": message.content})
             
             # Generate AI response
-            ai_response = await chatgpt_service.generate_response(ai_messages)
+            ai_response = await chatgpt_service.generate_response(ai_messages, conversation_id)
             
-            # Save assistant message
+            # Save assistant message at the end of the branch; another send may
+            # have extended it past our user message meanwhile, and both
+            # exchanges stay visible
+            parent_id = _lock_active_leaf(conn, cursor, conversation_id) or user_message_id
             assistant_message_id = str(uuid.uuid4())
             cursor.execute(
-                "INSERT INTO messages (id, conversation_id, role, content) VALUES (%s, %s, %s, %s)",
-                (assistant_message_id, conversation_id, "assistant", ai_response)
+                "INSERT INTO messages (id, conversation_id, role, content, parent_id) VALUES (%s, %s, %s, %s, %s)",
+                (assistant_message_id, conversation_id, "assistant", ai_response, parent_id)
             )
             
-            # Update conversation title if it's the first message
-            if conversation["title"] == "New chat" and len(history) == 0:
-                new_title = await chatgpt_service.generate_title(message.content)
-                cursor.execute(
-                    "UPDATE conversations SET title = %s WHERE id = %s",
-                    (new_title, conversation_id)
-                )
-            
-            # Update conversation updated_at
+            # Advance the active branch and update conversation summary and updated_at
             cursor.execute(
-                "UPDATE conversations SET updated_at = CURRENT_TIMESTAMP WHERE id = %s",
-                (conversation_id,)
+                "UPDATE conversations SET active_leaf_id = %s, message_count = message_count + 1, last_message_preview = %s, version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE id = %s",
+                (assistant_message_id, message_preview(ai_response), conversation_id)
             )
+            bump_list_version(cursor)
             
             conn.commit()
             
             # Fetch created assistant message
             cursor.execute(
-                "SELECT id, conversation_id, role, content, created_at FROM messages WHERE id = %s",
+                f"SELECT {MESSAGE_COLUMNS} FROM messages WHERE id = %s",
                 (assistant_message_id,)
             )
-            assistant_msg = cursor.fetchone()
+            assistant_msg = _serialize_message(cursor.fetchone())
+            event_broker.publish(conversation_id, {"type": "message.created", "message": assistant_msg})
+            _publish_summary(cursor, conversation_id)
             
             cursor.close()
-            
-            return {
-                "user_message": {
-                    "id": user_msg["id"],
-                    "conversation_id": user_msg["conversation_id"],
-                    "role": user_msg["role"],
-                    "content": user_msg["content"],
-                    "created_at": user_msg["created_at"].isoformat()
-                },
-                "assistant_message": {
-                    "id": assistant_msg["id"],
-                    "conversation_id": assistant_msg["conversation_id"],
-                    "role": assistant_msg["role"],
-                    "content": assistant_msg["content"],
-                    "created_at": assistant_msg["created_at"].isoformat()
-                }
-            }
+        
+        
+        # Title the conversation in the background if it's the first message;
+        # subscribers get a conversation.updated event when it lands
+        if conversation["title"] == "New chat" and len(history) == 0:
+            _spawn(_generate_title(conversation_id, message.content))
+        
+        return {
+            "user_message": user_msg,
+            "assistant_message": assistant_msg
+        }
     except HTTPException:
         raise
     except Exception as e:
@@ -230,14 +615,31 @@ async def send_message(conversation_id: str, message: MessageCreate):
 
 @router.post("/conversations/{conversation_id}/regenerate", response_model=MessageResponse)
 async def regenerate_response(conversation_id: str, request: RegenerateRequest):
-    """Regenerate the last AI response"""
+    """Regenerate an AI response
+    
+    The new answer is appended as a sibling of the old one with the next
+    version number, and the active branch is moved onto it; earlier versions
+    are kept. If another send or regenerate moved the branch while the answer
+    was generated, the new version is stored but the branch is left as the
+    other writer set it.
+    """
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor(dictionary=True)
             
+            cursor.execute(
+                "SELECT id, active_leaf_id, archived_at FROM conversations WHERE id = %s AND deleted_at IS NULL",
+                (conversation_id,)
+            )
+            conversation = cursor.fetchone()
+            if not conversation:
+                raise HTTPException(status_code=404, detail="Conversation not found")
+            
+            await _restore_if_archived(conn, conversation)
+            
             # Get the message to regenerate
             cursor.execute(
-                "SELECT id, role FROM messages WHERE id = %s AND conversation_id = %s",
+                "SELECT id, role, parent_id FROM messages WHERE id = %s AND conversation_id = %s",
                 (request.message_id, conversation_id)
             )
             message = cursor.fetchone()
@@ -245,16 +647,8 @@ async def regenerate_response(conversation_id: str, request: RegenerateRequest):
             if not message or message["role"] != "assistant":
                 raise HTTPException(status_code=400, detail="Invalid message for regeneration")
             
-            # Delete the old assistant message
-            cursor.execute("DELETE FROM messages WHERE id = %s", (request.message_id,))
-            conn.commit()
-            
-            # Get conversation history (excluding the deleted message)
-            cursor.execute(
-                "SELECT role, content FROM messages WHERE conversation_id = %s ORDER BY created_at ASC",
-                (conversation_id,)
-            )
-            history = cursor.fetchall()
+            # History is the branch leading up to the message being replaced
+            history = fetch_active_branch(cursor, message["parent_id"])
             
             # Prepare messages for AI
             ai_messages = []
@@ -262,33 +656,150 @@ async def regenerate_response(conversation_id: str, request: RegenerateRequest):
                 ai_messages.append({"role": msg["role"], "content": msg["content"]})
             
             # Generate new AI response
-            ai_response = await chatgpt_service.generate_response(ai_messages)
+            ai_response = await chatgpt_service.generate_response(ai_messages, conversation_id)
             
-            # Save new assistant message
+            # Append the new version next to its siblings and switch the branch
+            # to it, unless someone else moved the branch in the meantime
+            switch_branch = _lock_active_leaf(conn, cursor, conversation_id) == conversation["active_leaf_id"]
             new_message_id = str(uuid.uuid4())
             cursor.execute(
-                "INSERT INTO messages (id, conversation_id, role, content) VALUES (%s, %s, %s, %s)",
-                (new_message_id, conversation_id, "assistant", ai_response)
+                """
+                INSERT INTO messages (id, conversation_id, role, content, parent_id, version)
+                SELECT %s, %s, 'assistant', %s, %s, COALESCE(MAX(version), 0) + 1
+                FROM messages WHERE parent_id <=> %s AND conversation_id = %s
+                """,
+                (new_message_id, conversation_id, ai_response, message["parent_id"], message["parent_id"], conversation_id)
             )
+            if switch_branch:
+                cursor.execute(
+                    "UPDATE conversations SET active_leaf_id = %s, message_count = message_count + 1, last_message_preview = %s, version = version + 1 WHERE id = %s",
+                    (new_message_id, message_preview(ai_response), conversation_id)
+                )
+            else:
+                cursor.execute(
+                    "UPDATE conversations SET message_count = message_count + 1, version = version + 1 WHERE id = %s",
+                    (conversation_id,)
+                )
+            bump_list_version(cursor)
             conn.commit()
             
             # Fetch the new message
             cursor.execute(
-                "SELECT id, conversation_id, role, content, created_at FROM messages WHERE id = %s",
+                f"SELECT {MESSAGE_COLUMNS} FROM messages WHERE id = %s",
                 (new_message_id,)
             )
-            new_msg = cursor.fetchone()
+            new_msg = _serialize_message(cursor.fetchone())
+            event_broker.publish(conversation_id, {"type": "message.created", "message": new_msg})
+            _publish_summary(cursor, conversation_id)
             cursor.close()
-            
-            return {
-                "id": new_msg["id"],
-                "conversation_id": new_msg["conversation_id"],
-                "role": new_msg["role"],
-                "content": new_msg["content"],
-                "created_at": new_msg["created_at"].isoformat()
-            }
+        
+        return new_msg
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error regenerating response: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/usage", response_model=UsageResponse)
+async def get_usage(
+    conversation_id: Optional[str] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None
+):
+    """Per-day request and token totals, optionally for one conversation and a date range"""
+    try:
+        # Include usage still buffered in memory
+        await chatgpt_service.usage.flush()
+        
+        conditions = []
+        params = []
+        if conversation_id is not None:
+            conditions.append("conversation_id = %s")
+            params.append(conversation_id)
+        if start is not None:
+            conditions.append("day >= %s")
+            params.append(start)
+        if end is not None:
+            conditions.append("day <= %s")
+            params.append(end)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        
+        with get_db_connection() as conn:
+            cursor = conn.cursor(dictionary=True)
+            cursor.execute(
+                f"""
+                SELECT day, SUM(requests) AS requests, SUM(prompt_tokens) AS prompt_tokens,
+                       SUM(completion_tokens) AS completion_tokens
+                FROM usage_ledger {where}
+                GROUP BY day ORDER BY day ASC
+                """,
+                tuple(params)
+            )
+            rows = cursor.fetchall()
+            cursor.close()
+        
+        days = []
+        totals = {"requests": 0, "prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+        for row in rows:
+            entry = {
+                "day": row["day"].isoformat(),
+                "requests": int(row["requests"]),
+                "prompt_tokens": int(row["prompt_tokens"]),
+                "completion_tokens": int(row["completion_tokens"])
+            }
+            entry["total_tokens"] = entry["prompt_tokens"] + entry["completion_tokens"]
+            days.append(entry)
+            for key in totals:
+                totals[key] += entry[key]
+        
+        return {"conversation_id": conversation_id, "days": days, "totals": totals}
+    except Exception as e:
+        logger.error(f"Error fetching usage: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.websocket("/ws")
+async def conversation_updates(websocket: WebSocket):
+    """Push live message, title and deletion events
+    
+    Clients send {"action": "subscribe" | "unsubscribe", "topic": ...} where the
+    topic is a conversation id, or "conversations" for sidebar-level events.
+    """
+    await websocket.accept()
+    queue = event_broker.create_queue()
+    
+    async def forward_events():
+        while True:
+            event = await queue.get()
+            await websocket.send_json(event)
+    
+    async def receive_commands():
+        while True:
+            data = await websocket.receive_json()
+            action = data.get("action") if isinstance(data, dict) else None
+            topic = data.get("topic") if isinstance(data, dict) else None
+            if action not in ("subscribe", "unsubscribe") or not isinstance(topic, str):
+                await websocket.send_json({"type": "error", "detail": "Expected {action, topic}"})
+                continue
+            if action == "subscribe":
+                event_broker.subscribe(queue, topic)
+            else:
+                event_broker.unsubscribe(queue, topic)
+    
+    # Whichever side stops first (client gone, send failed) ends the connection
+    tasks = {asyncio.create_task(forward_events()), asyncio.create_task(receive_commands())}
+    try:
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        error = next((task.exception() for task in done if task.exception() is not None), None)
+        if error is not None and not isinstance(error, WebSocketDisconnect):
+            logger.error(f"WebSocket error: {str(error)}")
+            try:
+                await websocket.close(code=1011)
+            except Exception:
+                pass
+    finally:
+        event_broker.unsubscribe(queue)
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,18 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+import asyncio
+from database import check_database
+
+router = APIRouter(prefix="/api/health", tags=["health"])
+
+@router.get("/live")
+async def liveness():
+    """The process is up and serving requests; never touches the database"""
+    return {"status": "ok"}
+
+@router.get("/ready")
+async def readiness():
+    """The database is reachable, so chat requests can be served"""
+    if await asyncio.to_thread(check_database):
+        return {"status": "ready"}
+    return JSONResponse(status_code=503, content={"status": "unavailable"})
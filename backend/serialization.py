@@ -0,0 +1,68 @@
+import json
+from typing import Iterable, Iterator, Optional
+from database import get_stream_connection
+from message_tree import active_branch_query, prepare_branch_walk
+
+FETCH_SIZE = 500
+CHUNK_SIZE = 64 * 1024
+
+# Same settings as FastAPI's JSONResponse, so the wire format is unchanged
+_encode = json.JSONEncoder(ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode
+
+def coalesce(pieces: Iterable[str], chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """Join small string pieces into byte chunks of roughly chunk_size"""
+    buffer = []
+    size = 0
+    for piece in pieces:
+        data = piece.encode("utf-8")
+        buffer.append(data)
+        size += len(data)
+        if size >= chunk_size:
+            yield b"".join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield b"".join(buffer)
+
+def encode_message_row(row: tuple) -> str:
+    """Encode a message row (columns as in message_tree.MESSAGE_COLUMNS) as a MessageResponse object"""
+    message_id, conversation_id, role, content, created_at, parent_id, version = row
+    return (
+        f'{{"id":{_encode(message_id)},"conversation_id":{_encode(conversation_id)},'
+        f'"role":{_encode(role)},"content":{_encode(content)},'
+        f'"created_at":"{created_at.isoformat()}","parent_id":{_encode(parent_id)},'
+        f'"version":{version}}}'
+    )
+
+def _message_list_pieces(leaf_id: Optional[str]) -> Iterator[str]:
+    if leaf_id is None:
+        yield "[]"
+        return
+    # Held until the client has read the whole list, so not from the pool
+    with get_stream_connection() as conn:
+        # Plain tuple cursor, unbuffered: rows are encoded as they arrive
+        cursor = conn.cursor()
+        try:
+            prepare_branch_walk(cursor)
+            cursor.execute(active_branch_query(), (leaf_id,))
+            yield "["
+            separator = ""
+            while True:
+                rows = cursor.fetchmany(FETCH_SIZE)
+                if not rows:
+                    break
+                for row in rows:
+                    yield separator + encode_message_row(row)
+                    separator = ","
+            yield "]"
+        finally:
+            if conn.unread_result:
+                conn.consume_results()
+            cursor.close()
+
+def stream_message_list(leaf_id: Optional[str]) -> Iterator[bytes]:
+    """
+    Stream the branch ending at leaf_id as a JSON array, skipping per-row
+    dicts and response-model validation entirely.
+    """
+    return coalesce(_message_list_pieces(leaf_id))
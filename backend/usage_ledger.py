@@ -0,0 +1,96 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Optional
+from database import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+class UsageLedger:
+    """
+    Write-behind accumulator for token and request accounting.
+
+    Each model call adds to an in-memory counter keyed by (day, conversation,
+    model); nothing touches the database on the request path. A background
+    task periodically swaps the counters out and writes them as one batched
+    upsert, and stop() performs a final flush on shutdown. Rows that fail to
+    write are merged back and retried on the next flush.
+    """
+
+    def __init__(self, flush_interval=30.0):
+        self.flush_interval = flush_interval
+        self._pending = {}
+        self._task = None
+        self._flush_lock = None
+
+    def record(self, conversation_id: Optional[str], model: str, usage):
+        """Add one completion's usage; `usage` is the OpenAI response's usage object (may be None)"""
+        key = (datetime.now(timezone.utc).date(), conversation_id or "", model)
+        counters = self._pending.setdefault(key, [0, 0, 0])
+        counters[0] += 1
+        if usage is not None:
+            counters[1] += usage.prompt_tokens or 0
+            counters[2] += usage.completion_tokens or 0
+
+    def start(self):
+        """Start the periodic flush loop on the running event loop"""
+        if self._task is None or self._task.done():
+            self._flush_lock = asyncio.Lock()
+            self._task = asyncio.create_task(self._run())
+            logger.info("Usage ledger started")
+
+    async def stop(self):
+        """Cancel the flush loop and write out anything still pending"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        logger.info("Usage ledger stopped")
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self):
+        """Write accumulated usage to MySQL in one batched upsert"""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, {}
+            rows = [
+                (day, conversation_id, model, requests, prompt_tokens, completion_tokens)
+                for (day, conversation_id, model), (requests, prompt_tokens, completion_tokens) in pending.items()
+            ]
+            try:
+                await asyncio.to_thread(self._write, rows)
+            except Exception as e:
+                logger.error(f"Error flushing usage ledger: {str(e)}")
+                for key, (requests, prompt_tokens, completion_tokens) in pending.items():
+                    counters = self._pending.setdefault(key, [0, 0, 0])
+                    counters[0] += requests
+                    counters[1] += prompt_tokens
+                    counters[2] += completion_tokens
+
+    def _write(self, rows: list):
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany(
+                """
+                INSERT INTO usage_ledger (day, conversation_id, model, requests, prompt_tokens, completion_tokens)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                    requests = requests + VALUES(requests),
+                    prompt_tokens = prompt_tokens + VALUES(prompt_tokens),
+                    completion_tokens = completion_tokens + VALUES(completion_tokens)
+                """,
+                rows
+            )
+            conn.commit()
+            cursor.close()
@@ -1,9 +1,18 @@
 import React, { useState, useEffect } from 'react';
 import Sidebar from './components/Sidebar';
 import ChatArea from './components/ChatArea';
-import { conversationAPI } from './api/chatApi';
+import { conversationAPI, subscribeToUpdates } from './api/chatApi';
 import { toast } from './hooks/use-toast';
 
+// Put a message on the visible branch: everything after its parent (including
+// optimistic temp messages) is replaced by it; known ids are left alone
+const addToBranch = (list, message) => {
+  if (list.some(m => m.id === message.id)) return list;
+  if (message.parent_id === null) return [message];
+  const parentIndex = list.findIndex(m => m.id === message.parent_id);
+  return parentIndex === -1 ? [...list, message] : [...list.slice(0, parentIndex + 1), message];
+};
+
 const ChatApp = () => {
   const [conversations, setConversations] = useState([]);
   const [activeConversation, setActiveConversation] = useState(null);
@@ -17,10 +26,46 @@ const ChatApp = () => {
     // eslint-disable-next-line react-hooks/exhaustive-deps
   }, []);
 
+  // Keep sidebar titles, previews and deletions live
+  useEffect(() => {
+    const unsubscribe = subscribeToUpdates(['conversations'], (event) => {
+      if (event.type === 'conversation.updated') {
+        const { type, conversation_id, ...changes } = event;
+        setConversations(prev => {
+          const updated = prev.map(c => (c.id === conversation_id ? { ...c, ...changes } : c));
+          // A new message moves the conversation to the top, as the list is ordered by updated_at
+          return changes.updated_at
+            ? [...updated].sort((a, b) => b.updated_at.localeCompare(a.updated_at))
+            : updated;
+        });
+        setActiveConversation(prev => (
+          prev?.id === conversation_id ? { ...prev, ...changes } : prev
+        ));
+      } else if (event.type === 'conversation.deleted') {
+        setConversations(prev => prev.filter(c => c.id !== event.conversation_id));
+      }
+    }, { onReconnect: refreshConversations });
+    return unsubscribe;
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, []);
+
+  // Live messages for the open conversation, e.g. from another tab
+  const activeConversationId = activeConversation?.id;
+  useEffect(() => {
+    if (!activeConversationId) return undefined;
+    const unsubscribe = subscribeToUpdates([activeConversationId], (event) => {
+      if (event.type === 'message.created' && event.message.conversation_id === activeConversationId) {
+        setMessages(prev => addToBranch(prev, event.message));
+      }
+    }, { onReconnect: () => loadMessages(activeConversationId) });
+    return unsubscribe;
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [activeConversationId]);
+
   // Load conversations from API
   const loadConversations = async () => {
     try {
-      const data = await conversationAPI.getAll();
+      const data = await conversationAPI.getAll({ includePreview: true });
       setConversations(data);
       
       // Set first conversation as active if exists
@@ -38,6 +83,17 @@ const ChatApp = () => {
     }
   };
 
+  // Refetch the sidebar without changing the selection; cheap when nothing changed (ETag)
+  const refreshConversations = async () => {
+    try {
+      const data = await conversationAPI.getAll({ includePreview: true });
+      setConversations(data);
+      setActiveConversation(prev => (prev && data.find(c => c.id === prev.id)) || prev);
+    } catch (error) {
+      console.error('Error refreshing conversations:', error);
+    }
+  };
+
   // Load messages for a conversation
   const loadMessages = async (conversationId) => {
     try {
@@ -142,23 +198,19 @@ const ChatApp = () => {
       created_at: new Date().toISOString()
     };
 
-    setMessages([...messages, tempUserMessage]);
+    setMessages(prev => [...prev, tempUserMessage]);
     setIsLoading(true);
 
     try {
       // Send message and get AI response
       const response = await conversationAPI.sendMessage(currentConversation.id, content);
       
-      // Replace temp message with actual messages from backend
+      // Replace temp message with actual messages from backend; the live
+      // events may already have delivered them
       setMessages(prev => {
         const filtered = prev.filter(m => m.id !== tempUserMessage.id);
-        return [...filtered, response.user_message, response.assistant_message];
+        return addToBranch(addToBranch(filtered, response.user_message), response.assistant_message);
       });
-      
-      // Update conversation in list if title changed
-      if (currentConversation.title === 'New chat') {
-        await loadConversations();
-      }
     } catch (error) {
       console.error('Error sending message:', error);
       // Remove temp message on error
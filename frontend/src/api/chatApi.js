@@ -2,12 +2,57 @@ import axios from 'axios';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
+const WS_URL = `${API.replace(/^http/, 'ws')}/ws`;
+
+// Live updates: subscribe to conversation ids or 'conversations' (sidebar events).
+// The socket reconnects with backoff; onReconnect runs after each reconnect so
+// callers can refetch whatever they missed while it was down.
+export const subscribeToUpdates = (topics, onEvent, { onReconnect } = {}) => {
+  let socket = null;
+  let retryTimer = null;
+  let retryDelay = 1000;
+  let connected = false;
+  let closed = false;
+
+  const connect = () => {
+    socket = new WebSocket(WS_URL);
+    socket.onopen = () => {
+      topics.forEach((topic) => socket.send(JSON.stringify({ action: 'subscribe', topic })));
+      retryDelay = 1000;
+      if (connected && onReconnect) onReconnect();
+      connected = true;
+    };
+    socket.onmessage = (event) => onEvent(JSON.parse(event.data));
+    socket.onclose = () => {
+      if (closed) return;
+      retryTimer = setTimeout(connect, retryDelay);
+      retryDelay = Math.min(retryDelay * 2, 30000);
+    };
+  };
+
+  connect();
+  return () => {
+    closed = true;
+    clearTimeout(retryTimer);
+    socket.close();
+  };
+};
 
 // Conversation API
 export const conversationAPI = {
-  // Get all conversations
-  getAll: async () => {
-    const response = await axios.get(`${API}/conversations`);
+  // Get all conversations, optionally with message count and last-message preview
+  getAll: async ({ includePreview = false } = {}) => {
+    const response = await axios.get(`${API}/conversations`, {
+      params: includePreview ? { include_preview: true } : {}
+    });
+    return response.data;
+  },
+
+  // Search conversation titles and message content
+  search: async (query, { limit = 20, offset = 0 } = {}) => {
+    const response = await axios.get(`${API}/conversations/search`, {
+      params: { q: query, limit, offset }
+    });
     return response.data;
   },
 
@@ -29,6 +74,21 @@ export const conversationAPI = {
     return response.data;
   },
 
+  // Download URL for exporting one conversation (or all when id is omitted)
+  exportUrl: (conversationId, format = 'json') => (
+    conversationId
+      ? `${API}/conversations/${conversationId}/export?format=${format}`
+      : `${API}/conversations/export?format=${format}`
+  ),
+
+  // Bulk import conversations from a JSONL, JSON or ZIP file
+  importFile: async (file) => {
+    const formData = new FormData();
+    formData.append('file', file);
+    const response = await axios.post(`${API}/conversations/import`, formData);
+    return response.data;
+  },
+
   // Send message and get AI response
   sendMessage: async (conversationId, content) => {
     const response = await axios.post(
@@ -55,9 +55,16 @@ const Sidebar = ({ conversations, activeConversation, onNewChat, onSelectConvers
                 >
                   <div className="flex items-center gap-2 flex-1 min-w-0">
                     <MessageSquare className="h-4 w-4 text-gray-400 flex-shrink-0" />
-                    <span className="text-sm text-gray-100 truncate">
-                      {conversation.title}
-                    </span>
+                    <div className="flex flex-col min-w-0">
+                      <span className="text-sm text-gray-100 truncate">
+                        {conversation.title}
+                      </span>
+                      {conversation.last_message_preview && (
+                        <span className="text-xs text-gray-400 truncate">
+                          {conversation.last_message_preview}
+                        </span>
+                      )}
+                    </div>
                   </div>
                   <Button
                     variant="ghost"
@@ -0,0 +1,158 @@
+import io
+import sys
+from contextlib import contextmanager
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+import import_service
+from import_service import ConversationImporter, ImportFailed
+
+
+class FakeCursor:
+    """Applies the importer's statements to in-memory conversations and messages"""
+
+    def __init__(self, db):
+        self.db = db
+
+    def executemany(self, query, rows):
+        if query.startswith("INSERT INTO conversations"):
+            for conversation_id, title, _, _ in rows:
+                self.db["conversations"][conversation_id] = {
+                    "title": title, "message_count": 0, "last_message_preview": None, "active_leaf_id": None
+                }
+        elif query.startswith("INSERT INTO messages"):
+            for message_id, conversation_id, role, content, created_at, parent_id, version in rows:
+                self.db["messages"][message_id] = {
+                    "conversation_id": conversation_id, "role": role, "content": content, "parent_id": parent_id
+                }
+        elif query.startswith("UPDATE conversations"):
+            for count, preview, leaf_id, conversation_id in rows:
+                conversation = self.db["conversations"][conversation_id]
+                conversation["message_count"] += count
+                conversation["last_message_preview"] = preview
+                conversation["active_leaf_id"] = leaf_id
+        elif query.startswith("UPDATE messages SET parent_id"):
+            for parent_id, message_id in rows:
+                self.db["messages"][message_id]["parent_id"] = parent_id
+
+    def execute(self, query, params=None):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, db):
+        self.db = db
+        self.commits = 0
+
+    def cursor(self):
+        return FakeCursor(self.db)
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = {"conversations": {}, "messages": {}}
+
+    @contextmanager
+    def fake_connection():
+        yield FakeConnection(db)
+
+    monkeypatch.setattr(import_service, "get_db_connection", fake_connection)
+    return db
+
+
+def _branch(db, leaf_id):
+    """Contents from the root down to leaf_id, as the messages endpoint shows them"""
+    contents = []
+    while leaf_id is not None:
+        message = db["messages"][leaf_id]
+        contents.append(message["content"])
+        leaf_id = message["parent_id"]
+    return contents[::-1]
+
+
+def _jsonl(*lines):
+    return io.BytesIO("\n".join(lines).encode("utf-8"))
+
+
+def test_reply_before_its_parent_stays_on_the_active_branch(db):
+    upload = _jsonl(
+        '{"type": "conversation", "id": "c1", "title": "Out of order"}',
+        '{"type": "message", "id": "m2", "role": "assistant", "content": "answer", '
+        '"parent_id": "m1", "created_at": "2024-01-01T00:00:02"}',
+        '{"type": "message", "id": "m1", "role": "user", "content": "q", '
+        '"parent_id": null, "created_at": "2024-01-01T00:00:01"}',
+    )
+
+    stats = ConversationImporter(batch_size=2).import_file(upload, "history.jsonl")
+
+    assert stats == {"conversations": 1, "messages": 2, "skipped": 0}
+    (conversation,) = db["conversations"].values()
+    assert conversation["message_count"] == 2
+    assert conversation["last_message_preview"] == "answer"
+    assert _branch(db, conversation["active_leaf_id"]) == ["q", "answer"]
+
+
+def test_parent_cycle_keeps_file_order(db):
+    upload = _jsonl(
+        '{"type": "conversation", "title": "Cycle"}',
+        '{"type": "message", "id": "a", "role": "user", "content": "A", "parent_id": null}',
+        '{"type": "message", "id": "x", "role": "assistant", "content": "X", "parent_id": "y"}',
+        '{"type": "message", "id": "y", "role": "user", "content": "Y", "parent_id": "x"}',
+    )
+
+    ConversationImporter().import_file(upload, "history.jsonl")
+
+    (conversation,) = db["conversations"].values()
+    assert _branch(db, conversation["active_leaf_id"]) == ["A", "X", "Y"]
+
+
+def test_messages_without_parents_are_chained_in_file_order(db):
+    upload = io.BytesIO(
+        b'{"session": {"title": "Old export"}, "messages": ['
+        b'{"role": "user", "content": "hi"}, {"role": "assistant", "content": "hello"}, '
+        b'{"role": "system", "content": "ignored"}]}'
+    )
+
+    stats = ConversationImporter().import_file(upload, "history.json")
+
+    assert stats == {"conversations": 1, "messages": 2, "skipped": 1}
+    (conversation,) = db["conversations"].values()
+    assert _branch(db, conversation["active_leaf_id"]) == ["hi", "hello"]
+
+
+@pytest.mark.parametrize("filename, data", [
+    ("history.jsonl", b'[1, 2]\n'),
+    ("history.jsonl", b'"x"\n'),
+    ("history.json", b'{"conversations": [{"title": "t", "messages": [3]}]}'),
+    ("history.zip", b"not a zip"),
+])
+def test_malformed_input_is_a_value_error(db, filename, data):
+    with pytest.raises(ImportFailed) as excinfo:
+        ConversationImporter().import_file(io.BytesIO(data), filename)
+
+    assert isinstance(excinfo.value.__cause__, ValueError)
+
+
+def test_failure_reports_committed_rows(db):
+    lines = []
+    for index in range(5):
+        lines.append('{"type": "conversation", "title": "t%d"}' % index)
+        lines.append('{"type": "message", "role": "user", "content": "m%d"}' % index)
+    lines.append("{broken")
+
+    with pytest.raises(ImportFailed) as excinfo:
+        ConversationImporter(batch_size=2, transaction_rows=4).import_file(_jsonl(*lines), "history.jsonl")
+
+    assert excinfo.value.committed == {"conversations": 4, "messages": 4, "skipped": 0}